@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+import json
+
+# Optional compact/compressed encodings - fall back to JSON/gzip when not installed
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def result_hash(payload):
+    """Stable hash of a result payload, used as the base of its ETag."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def columnar_transcript(payload):
+    """Converting the transcript list of {timestamp, text} into parallel timestamp/text columns."""
+    transcript = payload.get("transcript", [])
+    compact = dict(payload)
+    compact["transcript"] = {
+        "timestamps": [item["timestamp"] for item in transcript],
+        "texts": [item["text"] for item in transcript]
+    }
+    return compact
+
+
+def negotiate_format(accept):
+    if msgpack is not None and any(t in (accept or "") for t in MSGPACK_TYPES):
+        return "msgpack"
+    return "json"
+
+
+def negotiate_encoding(accept_encoding):
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name] = q
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return "identity"
+
+
+def negotiate(accept, accept_encoding):
+    return negotiate_format(accept), negotiate_encoding(accept_encoding)
+
+
+def make_etag(digest, fmt, encoding):
+    # Each representation gets its own strong validator
+    return f'"{digest}-{fmt}-{encoding}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def precondition_status(method, if_none_match, etag):
+    """
+    Status for a matching If-None-Match, checked before the payload is encoded.
+    GET/HEAD get 304; other methods get 412 as RFC 9110 requires, so only the GET form can revalidate.
+    Returns None when the request should be served normally.
+    """
+    if not etag_matches(if_none_match, etag):
+        return None
+    return 304 if method in ("GET", "HEAD") else 412
+
+
+def response_headers(etag, fmt=None, encoding="identity"):
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept, Accept-Encoding",
+        "Cache-Control": "no-cache"
+    }
+    if fmt is not None:
+        headers["Content-Type"] = "application/msgpack" if fmt == "msgpack" else "application/json"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+    return headers
+
+
+def encode_body(payload, fmt, encoding):
+    """Serializing a payload in the negotiated format and content encoding."""
+    if fmt == "msgpack":
+        body = msgpack.packb(columnar_transcript(payload), use_bin_type=True)
+    else:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    if encoding == "br":
+        return brotli.compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
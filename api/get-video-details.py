@@ -1,10 +1,19 @@
 from http.server import BaseHTTPRequestHandler
+from collections import OrderedDict
+import hashlib
 import json
 import os
+import sys
 import yt_dlp
 import urllib.request
+from urllib.parse import parse_qs, urlparse
 from openai import OpenAI
 
+# Vercel does not route files starting with "_", so _encodeResponse.py ships alongside this function.
+# It is a verbatim copy of services/encodeResponse.py (functions cannot import from outside api/).
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _encodeResponse import result_hash, negotiate, make_etag, precondition_status, response_headers, encode_body
+
 # Initialize DeepSeek client
 # IMPORTANT: Set DEEPSEEK_API_KEY in Vercel environment variables!
 deepseek_key = os.getenv("DEEPSEEK_API_KEY")
@@ -40,6 +49,14 @@ Your goal is to extract the main topic and provide key bullet points.
 ---
 """
 
+# Results cached per warm instance, keyed by video_url or manual transcript hash: (hash, payload)
+RESULT_CACHE_SIZE = 64
+result_cache = OrderedDict()
+
+def is_error_summary(summary):
+    # Same check as services/resultCache.py: DeepSeek can also return no content at all
+    return not summary or summary.startswith("Error")
+
 def format_timestamp(seconds):
     hours = int(seconds // 3600)
     minutes = int((seconds % 3600) // 60)
@@ -255,87 +272,141 @@ def processManualTranscript(data):
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
+        # GET/HEAD ?video_url=... is the conditional-request form (If-None-Match -> 304)
+        query = parse_qs(urlparse(self.path).query)
+        if "video_url" in query:
+            self.send_details({"video_url": query["video_url"][0]}, self.command)
+            return
+
+        body = json.dumps({"message": "YouTube Summary API is working with yt-dlp!"}).encode()
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-
-        response = {"message": "YouTube Summary API is working with yt-dlp!"}
-        self.wfile.write(json.dumps(response).encode())
+        self.write_body(body)
         return
 
+    def do_HEAD(self):
+        # Same headers as GET (including 304 revalidation), without the body
+        self.do_GET()
+
+    def write_body(self, body):
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
     def do_POST(self):
         try:
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data.decode('utf-8'))
+        except Exception as e:
+            self.send_error_json(500, str(e))
+            return
+
+        self.send_details(data, "POST")
 
+    def send_error_json(self, status, message):
+        body = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.write_body(body)
+
+    def send_details(self, data, method):
+        try:
             # Check if this is MANUAL transcript (USER PASTE - 100% success!)
             if "manualTranscript" in data:
-                print("Processing manual transcript (user pasted)")
-                result = processManualTranscript(data)
-
-            # Otherwise, try backend fetch (AUTO METHOD)
+                manual_key = f"{data.get('videoId')}:{data.get('manualTranscript')}"
+                cache_key = "manual:" + hashlib.sha256(manual_key.encode("utf-8")).hexdigest()
             else:
                 video_url = data.get("video_url")
 
                 if not video_url:
-                    self.send_response(400)
-                    self.send_header('Content-type', 'application/json')
+                    self.send_error_json(400, "Missing video_url or transcript")
+                    return
+
+                cache_key = video_url
+
+            fmt, encoding = negotiate(self.headers.get('Accept'), self.headers.get('Accept-Encoding'))
+            cached = result_cache.get(cache_key)
+
+            # The ETag is known from the cached hash alone, so a match never encodes the payload
+            if cached is not None:
+                result_cache.move_to_end(cache_key)
+                etag = make_etag(cached[0], fmt, encoding)
+                status = precondition_status(method, self.headers.get('If-None-Match'), etag)
+                if status is not None:
+                    self.send_response(status)
+                    for name, value in response_headers(etag).items():
+                        self.send_header(name, value)
                     self.send_header('Access-Control-Allow-Origin', '*')
+                    self.send_header('Access-Control-Expose-Headers', 'ETag')
                     self.end_headers()
-                    self.wfile.write(json.dumps({"error": "Missing video_url or transcript"}).encode())
                     return
-
-                print("Trying backend fetch (may be blocked by YouTube)")
-                result = getVideoDetails(video_url)
-
-            if "error" in result:
-                self.send_response(500)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": result["error"]}).encode())
-                return
-
-            # If result already has summary (from processClientTranscript), use it
-            if "summary" in result:
-                response = {
-                    "title": result["title"],
-                    "transcript": result["formatted_transcript"],
-                    "summary": result["summary"]
-                }
             else:
-                # Otherwise generate summary (from getVideoDetails)
-                title = result["title"]
-                transcript_text = result["transcript_text"]
-                formatted_transcript = result["formatted_transcript"]
+                if "manualTranscript" in data:
+                    print("Processing manual transcript (user pasted)")
+                    result = processManualTranscript(data)
+
+                # Otherwise, try backend fetch (AUTO METHOD)
+                else:
+                    print("Trying backend fetch (may be blocked by YouTube)")
+                    result = getVideoDetails(video_url)
 
-                summary = sumTranscript(transcript_text)
+                if "error" in result:
+                    self.send_error_json(500, result["error"])
+                    return
+
+                # If result already has summary (from processClientTranscript), use it
+                if "summary" in result:
+                    response = {
+                        "title": result["title"],
+                        "transcript": result["formatted_transcript"],
+                        "summary": result["summary"]
+                    }
+                else:
+                    # Otherwise generate summary (from getVideoDetails)
+                    title = result["title"]
+                    transcript_text = result["transcript_text"]
+                    formatted_transcript = result["formatted_transcript"]
 
-                response = {
-                    "title": title,
-                    "transcript": formatted_transcript,
-                    "summary": summary
-                }
+                    summary = sumTranscript(transcript_text)
+
+                    response = {
+                        "title": title,
+                        "transcript": formatted_transcript,
+                        "summary": summary
+                    }
+
+                cached = (result_hash(response), response)
+
+                # Summary failures come back as "Error..." text - serve them once, never cache them
+                if not is_error_summary(response["summary"]):
+                    result_cache[cache_key] = cached
+                    if len(result_cache) > RESULT_CACHE_SIZE:
+                        result_cache.popitem(last=False)
+
+            digest, response = cached
+            body = encode_body(response, fmt, encoding)
 
             self.send_response(200)
-            self.send_header('Content-type', 'application/json')
+            for name, value in response_headers(make_etag(digest, fmt, encoding), fmt, encoding).items():
+                self.send_header(name, value)
             self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Expose-Headers', 'ETag')
+            self.send_header('Content-Length', str(len(body)))
             self.end_headers()
-
-            self.wfile.write(json.dumps(response).encode())
+            self.write_body(body)
 
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.send_error_json(500, str(e))
 
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, HEAD, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
         self.end_headers()
@@ -50,7 +50,7 @@ export const getVideo = async (req: Request, res: Response, next: NextFunction):
     const videoData: VideoDocument | null = await Video.findOne({ video_url });
 
     if (videoData) {
-      updateVecStore(videoData.transcript);
+      updateVecStore(videoData.transcript, String(videoData._id), String(userId));
       const userVideoRecord = await UserVideoData.findOne({ user: userId, video: videoData._id }).select("video notes chatHistory").populate<{ video: VideoDocument }>("video");
 
       if (userVideoRecord) {
@@ -108,7 +108,7 @@ export const getVideo = async (req: Request, res: Response, next: NextFunction):
       video: newVideo._id,
     });
 
-    updateVecStore(newVideo.transcript);
+    updateVecStore(newVideo.transcript, String(newVideo._id), String(userId));
 
     res.status(200).json({
       _id: newVideo._id,
@@ -135,15 +135,18 @@ export const getAns = async (req: Request, res: Response, next: NextFunction): P
     if (!userId) {
       throw new AppError("User does not have a _id", 500);
     }  
-    const { question } = req.body;
+    const { question, videoID } = req.body;
     if(!question) {
       throw new AppError("question is required!", 400);
     }
+    if(!videoID) {
+      throw new AppError("videoID is required!", 400);
+    }
 
     const flask_res = await fetch(`${config.FLASK_URI}/api/chat`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ question })
+      body: JSON.stringify({ question, video_id: String(videoID) })
     })
 
     const data = await flask_res.json();
@@ -159,6 +162,39 @@ export const getAns = async (req: Request, res: Response, next: NextFunction): P
   }
 }
 
+export const getLibraryAns = async (req: Request, res: Response, next: NextFunction): Promise<void> => {
+  try {
+    const user = req.user as UserDocument;
+    const userId = user?._id;
+
+    if (!userId) {
+      throw new AppError("User does not have a _id", 500);
+    }
+    const { question, videoIDs } = req.body;
+    if(!question) {
+      throw new AppError("question is required!", 400);
+    }
+
+    const flask_res = await fetch(`${config.FLASK_URI}/api/library/chat`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ question, user_id: String(userId), video_ids: videoIDs })
+    })
+
+    const data = await flask_res.json();
+
+    if (data.error) {
+      // An empty library (404) or a bad request (400) is not a server error
+      throw new AppError(data.error, flask_res.status === 404 || flask_res.status === 400 ? flask_res.status : 500);
+    }
+
+    res.status(200).json(data);
+  } catch(error) {
+    console.log("Error in getLibraryAns controller");
+    next(error);
+  }
+}
+
 export const saveNotes = async (req: Request, res: Response, next: NextFunction): Promise<void> => {
   try {
     const user = req.user as UserDocument;
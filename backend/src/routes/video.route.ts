@@ -1,5 +1,5 @@
 import express from "express";
-import { getVideo,getAllVideos, getAns, saveNotes } from "../controllers/video.controller";
+import { getVideo,getAllVideos, getAns, getLibraryAns, saveNotes } from "../controllers/video.controller";
 import protectRoute from "../middlewares/protectRoute.middleware";
 
 
@@ -7,6 +7,7 @@ const router = express.Router();
 router.get("/getAllVideos",protectRoute,getAllVideos);
 router.post("/getVideo",protectRoute,getVideo);
 router.post("/chat",protectRoute,getAns);
+router.post("/library/chat",protectRoute,getLibraryAns);
 router.post("/saveNotes",protectRoute,saveNotes);
 
 
@@ -3,7 +3,7 @@ import { transcript_segments } from "../types/custom";
 import { AppError } from "./AppError.util";
 
 
-export const updateVecStore = async (transcript: transcript_segments[]) => {
+export const updateVecStore = async (transcript: transcript_segments[], videoId: string, userId: string) => {
 
   const transcriptText = transcript.map(segment => segment.text).join(" ");
 
@@ -14,7 +14,9 @@ export const updateVecStore = async (transcript: transcript_segments[]) => {
         "Content-Type": "application/json"
       },
       body: JSON.stringify({
-        transcript_text: transcriptText
+        transcript_text: transcriptText,
+        video_id: videoId,
+        user_id: userId
       })
     });
 
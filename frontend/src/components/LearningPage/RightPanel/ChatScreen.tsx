@@ -5,7 +5,7 @@ import toast from "react-hot-toast";
 import { useGlobalContext } from "@/context/GlobalContext";
 
 function ChatScreen() {
-  const { authUser, chatMessages, setChatMessages } = useGlobalContext();
+  const { authUser, selectedVideo, chatMessages, setChatMessages } = useGlobalContext();
   const [input, setInput] = useState<string>("");
   const lastMessageRef = useRef<HTMLDivElement | null>(null);
 
@@ -22,7 +22,7 @@ function ChatScreen() {
             "Content-Type": "application/json",
             Authorization: "Bearer " + authUser?.token,
           },
-          body: JSON.stringify({ question: input }),
+          body: JSON.stringify({ question: input, videoID: selectedVideo?._id }),
         }
       );
       const data = await res.json();
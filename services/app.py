@@ -1,8 +1,11 @@
-from flask import Flask, request, jsonify;
+from flask import Flask, Response, request, jsonify;
 from getVideoDetails import getVideoDetails;
 from sumTranscript import sumTranscript;
-from chat import update_vector_store, ask_question
+from chat import update_vector_store, published_chunks, ask_question, ask_library
+from libraryIndex import add_video, link_user, search_library, MAX_K
 from getChapters import generate_chapters
+from encodeResponse import result_hash, negotiate, make_etag, precondition_status, response_headers, encode_body
+import resultCache
 
 app = Flask(__name__);
 
@@ -10,18 +13,11 @@ app = Flask(__name__);
 def home():
     return "YouTube Summary API is working!";
 
-@app.route('/api/get-video-details', methods=['POST'])
-def videoData():
-    data = request.get_json();
-    video_url = data.get("video_url");
-
-    if not video_url:
-        return jsonify({"error": "Missing video_url"}), 400;
-
+def buildVideoResult(video_url):
     result  = getVideoDetails(video_url);
 
     if "error" in result:
-        return jsonify({"error": result["error"]}), 500;
+        return None, result["error"];
 
     title = result["title"];
     transcript_text = result["transcript_text"];
@@ -30,42 +26,146 @@ def videoData():
     summary = sumTranscript(transcript_text);
     chapters = generate_chapters(formatted_transcript);
 
-
-    return jsonify({
+    return {
             "title":title,
             "transcript":formatted_transcript,
             "chapter":chapters,
             "summary": summary
-        });
+        }, None;
+
+# GET/HEAD ?video_url=... supports conditional requests (If-None-Match -> 304);
+# POST keeps the JSON body used by the backend (a matching If-None-Match gets 412 there).
+@app.route('/api/get-video-details', methods=['GET', 'POST'])
+def videoData():
+    data = request.args if request.method in ('GET', 'HEAD') else request.get_json();
+    video_url = data.get("video_url");
+
+    if not video_url:
+        return jsonify({"error": "Missing video_url"}), 400;
+
+    fmt, encoding = negotiate(request.headers.get("Accept"), request.headers.get("Accept-Encoding"));
+    payload = None;
+    digest = resultCache.get_digest(video_url);
+
+    # The ETag is known from the cached hash alone, so a match never loads or encodes the payload
+    if digest is not None:
+        etag = make_etag(digest, fmt, encoding);
+        status = precondition_status(request.method, request.headers.get("If-None-Match"), etag);
+        if status is not None:
+            return Response(status=status, headers=response_headers(etag));
+        payload = resultCache.get_payload(video_url);
+
+    if payload is None:
+        payload, error = buildVideoResult(video_url);
+        if error:
+            return jsonify({"error": error}), 500;
+
+        # Temporary LLM failures are served once but not cached
+        if resultCache.is_error_summary(payload["summary"]):
+            digest = result_hash(payload);
+        else:
+            digest = resultCache.put(video_url, payload);
+
+    etag = make_etag(digest, fmt, encoding);
+    body = encode_body(payload, fmt, encoding);
+    return Response(body, headers=response_headers(etag, fmt, encoding));
     
 @app.route('/api/update-vector-store', methods=['POST'])
 def update_vector():
     data = request.get_json()
     transcript_text = data.get("transcript_text")
+    video_id = data.get("video_id")
 
     if not transcript_text:
         return jsonify({"error": "Missing transcript_text"}), 400
+    if not video_id:
+        return jsonify({"error": "Missing video_id"}), 400
 
     try:
-        update_vector_store(transcript_text)
-        return jsonify({"message": "Vector store updated successfully"})
+        built = update_vector_store(transcript_text, video_id)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+    # The library index reuses the chat store's embeddings; its failures must not fail the chat update
+    try:
+        if built is None:
+            # Already indexed when first saved, so reopening only links this user to it
+            # (filled from the published index if that first library update failed)
+            if not link_user(video_id, data.get("user_id")):
+                texts, vectors = published_chunks(video_id)
+                add_video(video_id, data.get("user_id"), texts, vectors)
+        else:
+            texts, vectors = built
+            add_video(video_id, data.get("user_id"), texts, vectors)
+    except Exception as e:
+        print(f"Library indexing failed for video {video_id}: {e}")
+
+    return jsonify({"message": "Vector store updated successfully"})
     
 
 @app.route('/api/chat', methods=['POST'])
 def chat_with_video():
     data = request.get_json()
     question = data.get("question")
+    video_id = data.get("video_id")
 
     if not question:
         return jsonify({"error": "Missing question"}), 400
+    if not video_id:
+        return jsonify({"error": "Missing video_id"}), 400
 
     try:
-        answer = ask_question(question)
+        answer = ask_question(question, video_id)
         return jsonify({"answer": answer})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/library/search', methods=['POST'])
+def library_search():
+    data = request.get_json()
+    query = data.get("query")
+    user_id = data.get("user_id")
+
+    if not query:
+        return jsonify({"error": "Missing query"}), 400
+    if not user_id:
+        return jsonify({"error": "Missing user_id"}), 400
+
+    try:
+        k = min(max(int(data.get("k", 5)), 1), MAX_K)
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer"}), 400
+
+    try:
+        results = search_library(
+            query,
+            user_id=user_id,
+            video_ids=data.get("video_ids"),
+            k=k
+        )
+        return jsonify({"results": results})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/library/chat', methods=['POST'])
+def chat_with_library():
+    data = request.get_json()
+    question = data.get("question")
+    user_id = data.get("user_id")
+
+    if not question:
+        return jsonify({"error": "Missing question"}), 400
+    if not user_id:
+        return jsonify({"error": "Missing user_id"}), 400
+
+    try:
+        answer, sources = ask_library(question, user_id, video_ids=data.get("video_ids"))
+        if not sources:
+            return jsonify({"error": "No indexed videos found for this library."}), 404
+        return jsonify({"answer": answer, "sources": sources})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
     app.run(debug=True, port=8080)
\ No newline at end of file
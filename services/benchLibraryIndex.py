@@ -0,0 +1,90 @@
+import sys
+import time
+import numpy as np
+import faiss
+from libraryIndex import EMBEDDING_DIM, TRAIN_THRESHOLD, RETRAIN_GROWTH, build_trained_index, ann_search
+
+# Benchmark: python benchLibraryIndex.py [corpus sizes...]
+# Synthetic clustered embeddings stand in for transcript chunks (videos cover a limited set of topics).
+# Runs the production search path (IVF-PQ shortlist + exact re-rank) and reports recall@10 against exact search,
+# query latency (unfiltered and per-user filtered) and index memory. Exits 1 if recall misses the target.
+
+TOPICS = 2000
+QUERIES = 200
+K = 10
+RECALL_TARGET = 0.95
+
+
+def synthetic_vectors(n, centers, rng):
+    topics = rng.integers(0, len(centers), size=n)
+    vectors = centers[topics] + 0.6 * rng.standard_normal((n, centers.shape[1]), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def timed_search(idx, vectors, queries, allowed=None):
+    latencies = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        hits = ann_search(idx, vectors, query, K, allowed)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append([chunk_id for chunk_id, _ in hits])
+    return results, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def exact_top_k(vectors, queries, allowed=None):
+    candidates = np.arange(len(vectors)) if allowed is None else allowed
+    scores = queries @ vectors[candidates].T
+    return [candidates[np.argsort(-row)[:K]] for row in scores]
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / K for f, t in zip(found, truth)])
+
+
+def trained_rows(size):
+    # Mirrors production: trained at the threshold, retrained each time the corpus grows RETRAIN_GROWTH times over
+    rows = TRAIN_THRESHOLD
+    while rows * RETRAIN_GROWTH <= size:
+        rows *= RETRAIN_GROWTH
+    return min(rows, size)
+
+
+def bench(size, rng):
+    centers = rng.standard_normal((TOPICS, EMBEDDING_DIM), dtype=np.float32)
+    vectors = synthetic_vectors(size, centers, rng)
+    queries = synthetic_vectors(QUERIES, centers, rng)
+
+    train_rows = trained_rows(size)
+    started = time.perf_counter()
+    ivfpq = build_trained_index(vectors, train_rows)
+    if size > train_rows:
+        ivfpq.add_with_ids(vectors[train_rows:], np.arange(train_rows, size, dtype=np.int64))
+    build_s = time.perf_counter() - started
+
+    found, p50, p95 = timed_search(ivfpq, vectors, queries)
+    unfiltered_recall = recall(found, exact_top_k(vectors, queries))
+
+    # A user owning a third of the corpus: above SMALL_FILTER, so it goes through the filtered IVF path
+    allowed = np.arange(0, size, 3, dtype=np.int64)
+    found, filtered_p50, _ = timed_search(ivfpq, vectors, queries, allowed)
+    filtered_recall = recall(found, exact_top_k(vectors, queries, allowed))
+
+    _, exact_p50, _ = timed_search(None, vectors, queries)
+
+    print(f"{size:>8} chunks | recall@{K} {unfiltered_recall:.3f} (filtered {filtered_recall:.3f}) | "
+          f"p50 {p50:.2f}ms p95 {p95:.2f}ms (exact p50 {exact_p50:.2f}ms, filtered p50 {filtered_p50:.2f}ms) | "
+          f"index {faiss.serialize_index(ivfpq).nbytes / 1024 / 1024:.1f}MB, vectors {vectors.nbytes / 1024 / 1024:.1f}MB on disk | "
+          f"nlist {ivfpq.nlist} trained on {train_rows} in {build_s:.1f}s")
+    return min(unfiltered_recall, filtered_recall)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20000, 50000, 100000]
+    rng = np.random.default_rng(0)
+    worst = min(bench(size, rng) for size in sizes)
+    if worst < RECALL_TARGET:
+        print(f"FAIL: recall@{K} {worst:.3f} below target {RECALL_TARGET}")
+        sys.exit(1)
+    print(f"OK: recall@{K} >= {RECALL_TARGET} at every size")
@@ -5,20 +5,29 @@ from langchain_community.vectorstores import FAISS
 from langchain_core.runnables import RunnableParallel, RunnablePassthrough, RunnableLambda
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from collections import OrderedDict
 from utils import chunkingConfig
+from sharedIndex import save_index, load_index, current_version
+from libraryIndex import search_library
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Global cache
-vector_store = None
-main_chain = None
+# Per-process cache of chains over the shared, memory-mapped indexes: video_id -> (version, chain)
+CHAIN_CACHE_SIZE = 64
+chain_cache = OrderedDict()
 
 def format_docs(documents):
     return "\n\n".join(doc.page_content for doc in documents)
 
-def update_vector_store(transcript):
-    global vector_store, main_chain
+def update_vector_store(transcript, video_id):
+    """
+    Building and publishing a video's chat index, once: a saved video's transcript never changes,
+    so reopening it keeps the published version (and every worker's cached chain).
+    Returns the chunk texts and embeddings for the library index, or None if it was already published.
+    """
+    if current_version(video_id) is not None:
+        return None
 
     docs = [Document(page_content=transcript)]
     chunk_size,chunk_overlap = chunkingConfig(transcript)
@@ -26,7 +35,31 @@ def update_vector_store(transcript):
     chunks = splitter.split_documents(docs)
 
     embedding = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vector_store = FAISS.from_documents(chunks, embedding)
+    built_store = FAISS.from_documents(chunks, embedding)
+
+    # Publish once to the shared store, then map it back like every other worker does
+    version = save_index(built_store, video_id)
+    cache_chain(video_id, version, build_chain(load_index(video_id, version, embedding)))
+
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = built_store.index.reconstruct_n(0, built_store.index.ntotal)
+    return texts, vectors
+
+def published_chunks(video_id):
+    """Chunk texts and embeddings of a video's published index, read back without calling the embedding API."""
+    version = current_version(video_id)
+    vector_store = load_index(video_id, version, None)
+    ntotal = vector_store.index.ntotal
+    texts = [vector_store.docstore.search(str(position)).page_content for position in range(ntotal)]
+    return texts, vector_store.index.reconstruct_n(0, ntotal)
+
+def cache_chain(video_id, version, chain):
+    chain_cache[video_id] = (version, chain)
+    chain_cache.move_to_end(video_id)
+    if len(chain_cache) > CHAIN_CACHE_SIZE:
+        chain_cache.popitem(last=False)
+
+def build_chain(vector_store):
     retriever = vector_store.as_retriever()
 
     llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
@@ -59,10 +92,62 @@ def update_vector_store(transcript):
         'question': RunnablePassthrough()
     })
 
-    main_chain = parallel_chain | prompt | llm | parser
+    return parallel_chain | prompt | llm | parser
 
-def ask_question(question):
+def get_chain(video_id):
+    """Chain over the latest index published for the video by any worker, reloaded when a newer one appears."""
+    version = current_version(video_id)
+    if version is None:
+        return None
+
+    cached = chain_cache.get(video_id)
+    if cached is not None and cached[0] == version:
+        chain_cache.move_to_end(video_id)
+        return cached[1]
+
+    embedding = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    chain = build_chain(load_index(video_id, version, embedding))
+    cache_chain(video_id, version, chain)
+    return chain
+
+def ask_question(question, video_id):
+    main_chain = get_chain(video_id)
     if main_chain is None:
         raise ValueError("Vector store not initialized.")
     ans = main_chain.invoke(question)
     return ans
+
+def ask_library(question, user_id, video_ids=None):
+    """Answering a question across the user's whole library of processed videos. Returns (None, []) if it has none indexed."""
+    hits = search_library(question, user_id=user_id, video_ids=video_ids, k=8)
+    if not hits:
+        return None, []
+
+    context = "\n\n".join(f"[Video {hit['video_id']}]\n{hit['text']}" for hit in hits)
+
+    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+    prompt = PromptTemplate.from_template("""
+    You are a helpful AI assistant. Answer the question strictly based ONLY on the transcript excerpts provided below.
+    The excerpts come from several videos; each one is labelled with its video id.
+
+    CONTEXT:
+    -----------------
+    {context}
+    -----------------
+
+    INSTRUCTIONS:
+    - Use ONLY the information in the CONTEXT above to answer.
+    - Synthesize and paraphrase the information from the transcripts in your own words whenever possible.
+    - When the answer draws on different videos, make clear which points come from which video.
+    - If the answer is missing, unclear, or cannot be determined from the context, respond ONLY with: "I could not find the answer in your saved videos."
+    - DO NOT use any prior knowledge or add information not explicitly stated or clearly implied in the context.
+
+    QUESTION: {question}
+
+    Answer:
+    """)
+
+    chain = prompt | llm | StrOutputParser()
+    answer = chain.invoke({"context": context, "question": question})
+    sources = list(dict.fromkeys(hit["video_id"] for hit in hits))
+    return answer, sources
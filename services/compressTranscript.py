@@ -0,0 +1,221 @@
+import os
+import re
+import sys
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Rough token estimate used for DeepSeek input budgeting (~4 characters per token).
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 3000
+
+# Optional local extractive pre-compression before sending the transcript to DeepSeek
+COMPRESS_TRANSCRIPT = os.getenv("COMPRESS_TRANSCRIPT", "false").lower() == "true"
+COMPRESS_TOKEN_BUDGET = int(os.getenv("COMPRESS_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET)))
+
+# Very long videos keep at least this share of their text, so they are not cut to a handful of sentences.
+MIN_KEEP_RATIO = 0.1
+
+# Offline quality check: share of fixture sections whose keywords must survive compression.
+MIN_SECTION_COVERAGE = 0.8
+
+# The check compresses with this budget (below every fixture's size), not the deployment's COMPRESS_TOKEN_BUDGET.
+FIXTURE_TOKEN_BUDGET = 1500
+
+# --live check: unigram F1 the compressed-input summary must reach against the full-input summary.
+MIN_SUMMARY_OVERLAP = 0.4
+
+# Auto-captions rarely carry punctuation, so long runs are cut into word windows.
+MAX_SENTENCE_WORDS = 40
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "had",
+    "has", "have", "he", "her", "his", "i", "if", "in", "is", "it", "its", "just",
+    "like", "me", "my", "not", "of", "oh", "on", "or", "so", "that", "the", "their",
+    "them", "then", "there", "they", "this", "to", "uh", "um", "was", "we", "were",
+    "what", "when", "which", "with", "you", "your", "yeah", "okay", "know", "really"
+}
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def split_sentences(text):
+    """Splitting text on sentence punctuation, falling back to word windows for unpunctuated captions."""
+    sentences = []
+    for part in re.split(r"(?<=[.!?])\s+", text.strip()):
+        words = part.split()
+        for i in range(0, len(words), MAX_SENTENCE_WORDS):
+            sentences.append(" ".join(words[i:i + MAX_SENTENCE_WORDS]))
+    return [s for s in sentences if s]
+
+
+def tfidf_matrix(sentences):
+    """
+    Sparse, L2-normalized TF-IDF rows in coordinate form (rows, cols, data).
+    Long streams produce tens of thousands of sentences, so no dense sentences x vocab matrix is built.
+    """
+    vocab = {}
+    rows, cols, counts = [], [], []
+    for row, sentence in enumerate(sentences):
+        term_counts = {}
+        for w in re.findall(r"\w+", sentence.lower()):
+            if w in STOPWORDS or len(w) < 2:
+                continue
+            col = vocab.setdefault(w, len(vocab))
+            term_counts[col] = term_counts.get(col, 0) + 1
+        rows.extend([row] * len(term_counts))
+        cols.extend(term_counts.keys())
+        counts.extend(term_counts.values())
+
+    n = len(sentences)
+    rows = np.array(rows, dtype=np.int64)
+    cols = np.array(cols, dtype=np.int64)
+    data = np.array(counts, dtype=np.float64)
+
+    df = np.bincount(cols, minlength=len(vocab))
+    idf = np.log((1 + n) / (1 + df)) + 1
+    data *= idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=n))
+    norms[norms == 0] = 1
+    data /= norms[rows]
+    return rows, cols, data
+
+
+def textrank(rows, cols, data, n, damping=0.85, max_iter=100, tol=1e-6):
+    """PageRank over the cosine similarity graph S = X X^T (without self-loops), never materializing S."""
+    vocab_size = int(cols.max()) + 1 if len(cols) else 0
+    self_similarity = np.bincount(rows, weights=data ** 2, minlength=n)
+
+    def similarity_dot(v):
+        projected = np.bincount(cols, weights=data * v[rows], minlength=vocab_size)
+        return np.bincount(rows, weights=data * projected[cols], minlength=n) - self_similarity * v
+
+    row_sums = similarity_dot(np.ones(n))
+    # Sentences with no overlap spread their weight evenly instead of leaking it.
+    dangling = row_sums <= 1e-12
+    safe_sums = np.where(dangling, 1, row_sums)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        spread = similarity_dot(np.where(dangling, 0, scores / safe_sums)) + scores[dangling].sum() / n
+        updated = (1 - damping) / n + damping * spread
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def compressTranscript(transcript, token_budget=COMPRESS_TOKEN_BUDGET, min_ratio=MIN_KEEP_RATIO):
+    """
+    Keeping only the most central sentences of a transcript up to a token budget
+    (raised to min_ratio of the original for very long transcripts).
+    Returns the reduced text (in original order) and a stats dict.
+    """
+    started = time.perf_counter()
+    original_tokens = estimate_tokens(transcript)
+    token_budget = max(token_budget, int(original_tokens * min_ratio))
+    stats = {
+        "original_tokens": original_tokens,
+        "compressed_tokens": original_tokens,
+        "compression_ratio": 1.0,
+        "skipped": True,
+        "elapsed_ms": 0.0
+    }
+
+    sentences = split_sentences(transcript)
+    if original_tokens <= token_budget or len(sentences) < 3:
+        return transcript, stats
+
+    rows, cols, data = tfidf_matrix(sentences)
+    scores = textrank(rows, cols, data, len(sentences))
+
+    selected = []
+    used = 0
+    for idx in np.argsort(-scores, kind="stable"):
+        cost = estimate_tokens(sentences[idx]) + 1
+        if used + cost > token_budget:
+            continue
+        selected.append(idx)
+        used += cost
+
+    compressed = " ".join(sentences[i] for i in sorted(selected))
+    compressed_tokens = estimate_tokens(compressed)
+    stats.update({
+        "compressed_tokens": compressed_tokens,
+        "compression_ratio": round(compressed_tokens / original_tokens, 3),
+        "skipped": False,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    })
+    return compressed, stats
+
+
+def word_overlap(reference, candidate):
+    """Unigram F1 between two summaries, used as a cheap quality check."""
+    ref = [w for w in re.findall(r"\w+", reference.lower()) if w not in STOPWORDS]
+    cand = [w for w in re.findall(r"\w+", candidate.lower()) if w not in STOPWORDS]
+    if not ref or not cand:
+        return 0.0
+    common = sum(min(ref.count(w), cand.count(w)) for w in set(cand))
+    precision = common / len(cand)
+    recall = common / len(ref)
+    return 0.0 if common == 0 else round(2 * precision * recall / (precision + recall), 3)
+
+
+def section_coverage(text, sections):
+    """Share of sections (each a list of alternative keywords) with at least one keyword present in text."""
+    lowered = text.lower()
+    covered = [any(keyword in lowered for keyword in keywords) for keywords in sections]
+    return round(sum(covered) / len(sections), 3) if sections else 1.0
+
+
+def load_sections(path):
+    """Fixture keywords live next to the transcript: one section per line, comma-separated alternatives."""
+    with open(os.path.splitext(path)[0] + ".keywords", encoding="utf-8") as f:
+        return [[k.strip().lower() for k in line.split(",") if k.strip()] for line in f if line.strip()]
+
+
+if __name__ == '__main__':
+    # Quality check on fixture transcripts, failing if a fixture is left uncompressed or loses sections:
+    #   python compressTranscript.py fixtures/transcripts/*.txt
+    # Add --live to also require DeepSeek summaries with and without compression to agree (needs DEEPSEEK_API_KEY).
+    live = "--live" in sys.argv
+    paths = [arg for arg in sys.argv[1:] if arg != "--live"]
+    failed = False
+
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+
+        compressed, stats = compressTranscript(text, FIXTURE_TOKEN_BUDGET)
+        coverage = section_coverage(compressed, load_sections(path))
+        failed = failed or stats["skipped"] or coverage < MIN_SECTION_COVERAGE
+        report = (f"{path}: ratio={stats['compression_ratio']} "
+                  f"tokens={stats['original_tokens']}->{stats['compressed_tokens']} "
+                  f"elapsed={stats['elapsed_ms']}ms coverage={coverage}")
+        if stats["skipped"]:
+            report += f" (not compressed: fixture is within the {FIXTURE_TOKEN_BUDGET}-token budget)"
+
+        if live:
+            from sumTranscript import sumTranscript
+            from resultCache import is_error_summary
+
+            started = time.perf_counter()
+            full_summary = sumTranscript(text, compress=False)
+            full_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            reduced_summary = sumTranscript(text, compress=True, token_budget=FIXTURE_TOKEN_BUDGET)
+            reduced_ms = (time.perf_counter() - started) * 1000
+
+            overlap = 0.0
+            if not is_error_summary(full_summary) and not is_error_summary(reduced_summary):
+                overlap = word_overlap(full_summary, reduced_summary)
+            failed = failed or overlap < MIN_SUMMARY_OVERLAP
+            report += f" latency={full_ms:.0f}ms->{reduced_ms:.0f}ms overlap={overlap}"
+        print(report)
+
+    sys.exit(1 if failed else 0)
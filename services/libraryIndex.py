@@ -0,0 +1,370 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+import numpy as np
+import faiss
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+# File locks keep writers in different worker processes from interleaving (not available on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Persistent corpus-wide index over every processed video's chunks
+LIBRARY_DIR = os.getenv("LIBRARY_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "library_index"))
+INDEX_FILE = os.path.join(LIBRARY_DIR, "library.faiss")
+META_FILE = os.path.join(LIBRARY_DIR, "library.meta.json")
+DB_FILE = os.path.join(LIBRARY_DIR, "library.db")
+LOCK_FILE = os.path.join(LIBRARY_DIR, "library.lock")
+TRAIN_LOCK_FILE = os.path.join(LIBRARY_DIR, "train.lock")
+
+# Append-only normalized embeddings; a chunk's id is its row, so the file doubles as the persisted id counter.
+# Memory-mapped for exact re-ranking and exact search before the IVF-PQ index exists.
+VECTORS_FILE = os.path.join(LIBRARY_DIR, "vectors.f32")
+
+EMBEDDING_DIM = 768
+ROW_BYTES = EMBEDDING_DIM * 4
+
+# Exact search until the corpus is big enough to train IVF-PQ; retrain whenever it has grown this many times over
+TRAIN_THRESHOLD = int(os.getenv("LIBRARY_TRAIN_THRESHOLD", "20000"))
+RETRAIN_GROWTH = 4
+PQ_M = int(os.getenv("LIBRARY_PQ_M", "64"))
+TRAIN_POINTS_PER_LIST = 64
+
+# Train in a background thread of the worker that crosses the threshold; set false to only train offline
+BACKGROUND_TRAINING = os.getenv("LIBRARY_BACKGROUND_TRAINING", "true").lower() == "true"
+
+# PQ distances only shortlist candidates; the final order comes from exact scores over this many
+RERANK_CANDIDATES = 50
+MIN_CANDIDATES = 100
+
+# Upper bound on results per search; the IVF shortlist grows with k
+MAX_K = 50
+
+# Filters this selective are scored exactly, IVF probes could miss all of the allowed chunks
+SMALL_FILTER = 5000
+EXACT_BATCH = 4096
+
+# Per-process read-only views of the on-disk files
+index = None
+index_mtime = None
+vectors = None
+embedding = None
+_lock = threading.Lock()
+_training = threading.Event()
+
+
+def _embedding():
+    global embedding
+    if embedding is None:
+        embedding = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    return embedding
+
+
+def _connect():
+    os.makedirs(LIBRARY_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute("CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, video_id TEXT NOT NULL, text TEXT NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS chunks_video ON chunks (video_id)")
+    conn.execute("CREATE TABLE IF NOT EXISTS video_users (video_id TEXT NOT NULL, user_id TEXT NOT NULL, PRIMARY KEY (video_id, user_id))")
+    return conn
+
+
+@contextmanager
+def _file_lock(path, blocking=True):
+    """Exclusive lock shared across processes; yields False when non-blocking and already held."""
+    os.makedirs(LIBRARY_DIR, exist_ok=True)
+    with open(path, "w") as f:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _normalize(vectors):
+    vectors = np.array(vectors, dtype=np.float32, copy=True, order="C")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def nlist_for(rows):
+    return int(np.clip(4 * np.sqrt(rows), 64, 8192))
+
+
+def nprobe_for(nlist):
+    return max(16, nlist // 4)
+
+
+def build_trained_index(vectors, rows, seed=0):
+    """
+    Training an IVF-PQ index on the first `rows` vectors (sampled) and adding all of them under their row ids.
+    nlist grows with the corpus, so retraining after growth keeps the lists short.
+    """
+    nlist = nlist_for(rows)
+    sample_size = min(rows, nlist * TRAIN_POINTS_PER_LIST)
+    sample = np.sort(np.random.default_rng(seed).choice(rows, sample_size, replace=False))
+
+    ivfpq = faiss.index_factory(EMBEDDING_DIM, f"IVF{nlist},PQ{PQ_M}x8", faiss.METRIC_INNER_PRODUCT)
+    ivfpq.train(np.ascontiguousarray(vectors[sample]))
+    for start in range(0, rows, 65536):
+        end = min(start + 65536, rows)
+        ivfpq.add_with_ids(np.ascontiguousarray(vectors[start:end]), np.arange(start, end, dtype=np.int64))
+    return ivfpq
+
+
+def ann_search(idx, vectors, query, k, allowed=None):
+    """
+    Top-k (id, score) pairs for a normalized query.
+    IVF-PQ shortlists candidates which are re-ranked with exact scores from the stored vectors;
+    without an index, or for small filters, the allowed rows are scored exactly.
+    """
+    if idx is None or (allowed is not None and len(allowed) <= SMALL_FILTER):
+        candidates = np.arange(len(vectors), dtype=np.int64) if allowed is None else allowed
+    else:
+        kwargs = {"nprobe": nprobe_for(idx.nlist)}
+        if allowed is not None:
+            # Only this share of each probed list is eligible, so probe proportionally more lists
+            kwargs["nprobe"] = min(idx.nlist, int(np.ceil(kwargs["nprobe"] * idx.ntotal / len(allowed))))
+            kwargs["sel"] = faiss.IDSelectorBatch(len(allowed), faiss.swig_ptr(allowed))
+        shortlist = max(k * RERANK_CANDIDATES, MIN_CANDIDATES)
+        _, ids = idx.search(query[None, :], shortlist, params=faiss.SearchParametersIVF(**kwargs))
+        candidates = ids[0][ids[0] >= 0]
+
+    candidates = np.unique(candidates)
+    candidates = candidates[candidates < len(vectors)]
+    if len(candidates) == 0:
+        return []
+
+    scores = np.concatenate([
+        vectors[candidates[i:i + EXACT_BATCH]] @ query for i in range(0, len(candidates), EXACT_BATCH)
+    ])
+    top = np.argsort(-scores)[:k]
+    return [(int(candidates[i]), float(scores[i])) for i in top]
+
+
+def _vector_rows():
+    try:
+        return os.path.getsize(VECTORS_FILE) // ROW_BYTES
+    except FileNotFoundError:
+        return 0
+
+
+def _open_vectors(rows):
+    if rows == 0:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.memmap(VECTORS_FILE, dtype=np.float32, mode="r", shape=(rows, EMBEDDING_DIM))
+
+
+def _append_vectors(new_vectors):
+    """Appending rows under the write lock; a partial row left by a crash is truncated first. Returns the first new id."""
+    os.makedirs(LIBRARY_DIR, exist_ok=True)
+    with open(VECTORS_FILE, "ab") as f:
+        start = f.tell() // ROW_BYTES
+        f.truncate(start * ROW_BYTES)
+        f.seek(start * ROW_BYTES)
+        f.write(new_vectors.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    return start
+
+
+def _read_meta():
+    try:
+        with open(META_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_index(idx, meta):
+    """Swapping in a new index file, then its metadata (rows trained on, rows indexed)."""
+    tmp_index = f"{INDEX_FILE}.{os.getpid()}.tmp"
+    faiss.write_index(idx, tmp_index)
+    os.replace(tmp_index, INDEX_FILE)
+
+    # If a crash lands between the two swaps, indexed_rows is behind and the next add re-indexes those rows;
+    # search de-duplicates ids, so that is harmless
+    tmp_meta = f"{META_FILE}.{os.getpid()}.tmp"
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, META_FILE)
+
+
+def _reader_views():
+    """Read-only index (IVF lists memory-mapped, shared by every worker) and vectors, reopened when files change."""
+    global index, index_mtime, vectors
+
+    with _lock:
+        try:
+            mtime = os.path.getmtime(INDEX_FILE)
+        except FileNotFoundError:
+            mtime = None
+        if mtime != index_mtime:
+            index = None if mtime is None else faiss.read_index(INDEX_FILE, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            index_mtime = mtime
+
+        rows = _vector_rows()
+        if vectors is None or len(vectors) != rows:
+            vectors = _open_vectors(rows)
+        return index, vectors
+
+
+def _link_user(conn, video_id, user_id):
+    if user_id:
+        conn.execute("INSERT OR IGNORE INTO video_users (video_id, user_id) VALUES (?, ?)", (video_id, user_id))
+        conn.commit()
+
+
+def link_user(video_id, user_id):
+    """Giving a user access to an already indexed video, without touching the vectors. Returns False if it has no chunks yet."""
+    conn = _connect()
+    try:
+        _link_user(conn, video_id, user_id)
+        return conn.execute("SELECT 1 FROM chunks WHERE video_id = ? LIMIT 1", (video_id,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def add_video(video_id, user_id, texts, chunk_vectors):
+    """
+    Adding a processed video's chunks, with the embeddings already computed for its chat store.
+    Videos already indexed are only linked to the user. Returns the number of chunks added.
+    """
+    conn = _connect()
+    try:
+        _link_user(conn, video_id, user_id)
+
+        if conn.execute("SELECT 1 FROM chunks WHERE video_id = ? LIMIT 1", (video_id,)).fetchone():
+            return 0
+
+        new_vectors = _normalize(chunk_vectors)
+
+        with _file_lock(LOCK_FILE):
+            if conn.execute("SELECT 1 FROM chunks WHERE video_id = ? LIMIT 1", (video_id,)).fetchone():
+                return 0
+
+            # Rows are durable before the index refers to them, and ids come from the vectors file
+            start = _append_vectors(new_vectors)
+            conn.executemany(
+                "INSERT INTO chunks (id, video_id, text) VALUES (?, ?, ?)",
+                [(start + offset, video_id, text) for offset, text in enumerate(texts)]
+            )
+            conn.commit()
+            rows = start + len(texts)
+
+            meta = _read_meta()
+            if meta is not None:
+                # Writers load their own writable copy; readers keep their memory-mapped one until the swap
+                writable = faiss.read_index(INDEX_FILE)
+                stored = _open_vectors(rows)
+                missing_from = meta["indexed_rows"]
+                writable.add_with_ids(
+                    np.ascontiguousarray(stored[missing_from:rows]),
+                    np.arange(missing_from, rows, dtype=np.int64)
+                )
+                _save_index(writable, {**meta, "indexed_rows": rows})
+    finally:
+        conn.close()
+
+    if BACKGROUND_TRAINING and needs_training(rows, meta) and not _training.is_set():
+        _training.set()
+        threading.Thread(target=_train_in_background, daemon=True).start()
+    return len(texts)
+
+
+def needs_training(rows, meta):
+    if meta is None:
+        return rows >= TRAIN_THRESHOLD
+    return rows >= RETRAIN_GROWTH * meta["trained_rows"]
+
+
+def _train_in_background():
+    try:
+        train_library_index()
+    except Exception as e:
+        print(f"Library index training failed: {e}")
+    finally:
+        _training.clear()
+
+
+def train_library_index(force=False):
+    """
+    Training IVF-PQ over every stored vector without holding the write lock, then swapping it in.
+    Searches keep using the previous index (or exact search) until the swap. Returns True if an index was swapped in.
+    """
+    with _file_lock(TRAIN_LOCK_FILE, blocking=False) as acquired:
+        if not acquired:
+            return False
+
+        rows = _vector_rows()
+        if rows == 0 or not (force or needs_training(rows, _read_meta())):
+            return False
+
+        trained = build_trained_index(_open_vectors(rows), rows)
+
+        with _file_lock(LOCK_FILE):
+            # Chunks added while training ran are appended before the swap
+            latest = _vector_rows()
+            if latest > rows:
+                stored = _open_vectors(latest)
+                trained.add_with_ids(
+                    np.ascontiguousarray(stored[rows:latest]),
+                    np.arange(rows, latest, dtype=np.int64)
+                )
+            _save_index(trained, {"trained_rows": rows, "indexed_rows": latest})
+        return True
+
+
+def _allowed_ids(conn, user_id, video_ids):
+    query = "SELECT id FROM chunks WHERE video_id IN (SELECT video_id FROM video_users WHERE user_id = ?)"
+    params = [user_id]
+    if video_ids:
+        query += f" AND video_id IN ({', '.join('?' * len(video_ids))})"
+        params.extend(video_ids)
+    return np.array([row[0] for row in conn.execute(query, params)], dtype=np.int64)
+
+
+def search_library(query, user_id, video_ids=None, k=5):
+    """Finding the k chunks closest to the query across a user's videos, optionally limited to some of them."""
+    conn = _connect()
+    try:
+        allowed = _allowed_ids(conn, user_id, video_ids)
+        if len(allowed) == 0:
+            return []
+
+        query_vector = _normalize([_embedding().embed_query(query)])[0]
+        idx, stored = _reader_views()
+        hits = ann_search(idx, stored, query_vector, k, allowed)
+        if not hits:
+            return []
+
+        rows = conn.execute(
+            f"SELECT id, video_id, text FROM chunks WHERE id IN ({', '.join('?' * len(hits))})",
+            [chunk_id for chunk_id, _ in hits]
+        )
+        chunks = {row[0]: row[1:] for row in rows}
+        return [
+            {"video_id": chunks[chunk_id][0], "text": chunks[chunk_id][1], "score": score}
+            for chunk_id, score in hits if chunk_id in chunks
+        ]
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    # Offline (re)training, e.g. from cron with LIBRARY_BACKGROUND_TRAINING=false:
+    #   python libraryIndex.py train [--force]
+    if sys.argv[1:2] == ["train"]:
+        print("Trained" if train_library_index(force="--force" in sys.argv) else "Nothing to train")
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import tempfile
+from encodeResponse import result_hash
+
+# Results shared by every worker and kept across restarts, so ETags stay valid wherever a request lands
+CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "yusuf_result_cache"))
+MAX_ENTRIES = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".result")
+
+
+def is_error_summary(summary):
+    """sumTranscript reports failures as text; those results must not be cached."""
+    return not summary or summary.startswith("Error")
+
+
+def get_digest(key):
+    """Hash of the cached result, read without loading the payload. None on a miss."""
+    try:
+        with open(_path(key), encoding="utf-8") as f:
+            return f.readline().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def get_payload(key):
+    try:
+        with open(_path(key), encoding="utf-8") as f:
+            f.readline()
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def put(key, payload):
+    """Storing a result as its hash line followed by the JSON payload, in one atomically replaced file."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    digest = result_hash(payload)
+    path = _path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(digest + "\n")
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    _prune()
+    return digest
+
+
+def _prune():
+    entries = [os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR) if name.endswith(".result")]
+    if len(entries) <= MAX_ENTRIES:
+        return
+    entries.sort(key=os.path.getmtime)
+    for path in entries[:len(entries) - MAX_ENTRIES]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
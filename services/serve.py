@@ -0,0 +1,32 @@
+import multiprocessing
+import os
+from gunicorn.app.base import BaseApplication
+from app import app
+
+# Preforked multi-worker entry point: python serve.py
+# Workers share chat indexes through sharedIndex (VECTOR_STORE_DIR), so no sticky sessions are needed.
+
+class ServiceApplication(BaseApplication):
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        return self.application
+
+
+if __name__ == '__main__':
+    options = {
+        "bind": f"0.0.0.0:{os.getenv('PORT', '8080')}",
+        "workers": int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count())),
+        "timeout": int(os.getenv("WORKER_TIMEOUT", "300")),
+        # Import the app once in the master so workers share its pages copy-on-write
+        "preload_app": True
+    }
+    ServiceApplication(app, options).run()
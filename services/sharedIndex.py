@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import faiss
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+
+# Local directory shared by every worker process on the host, one subdirectory per video
+STORE_DIR = os.getenv("VECTOR_STORE_DIR", os.path.join(tempfile.gettempdir(), "yusuf_vector_store"))
+CURRENT_FILE = "CURRENT"
+
+# Older versions are kept briefly so workers mid-load never see a missing file
+KEEP_VERSIONS = 3
+
+# Flat codes are mapped straight from the file (needs faiss >= 1.11); IO_FLAG_MMAP alone only covers IVF lists
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+class SqliteDocstore(Docstore):
+    """Read-only docstore over a published version's docs.db, so chunk text is not copied into every worker."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def search(self, search):
+        # A connection per lookup keeps this safe across Flask/gunicorn threads
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT page_content, metadata FROM docs WHERE position = ?", (int(search),)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+
+def _video_dir(video_id):
+    return os.path.join(STORE_DIR, hashlib.sha256(str(video_id).encode("utf-8")).hexdigest()[:32])
+
+
+def current_version(video_id):
+    """Name of the latest published index version for a video, or None if nothing has been written yet."""
+    try:
+        with open(os.path.join(_video_dir(video_id), CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_index(vector_store, video_id):
+    """
+    Writing a video's FAISS vector store to the shared store once and publishing it as its current version.
+    The version directory is fully written before CURRENT is atomically swapped to point at it.
+    """
+    video_dir = _video_dir(video_id)
+    os.makedirs(video_dir, exist_ok=True)
+    version = f"v{time.time_ns()}-{os.getpid()}"
+    tmp_dir = os.path.join(video_dir, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+
+    faiss.write_index(vector_store.index, os.path.join(tmp_dir, "index.faiss"))
+
+    conn = sqlite3.connect(os.path.join(tmp_dir, "docs.db"))
+    try:
+        conn.execute("CREATE TABLE docs (position INTEGER PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL)")
+        rows = []
+        for position in range(vector_store.index.ntotal):
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+            rows.append((position, doc.page_content, json.dumps(doc.metadata)))
+        conn.executemany("INSERT INTO docs (position, page_content, metadata) VALUES (?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_dir, os.path.join(video_dir, version))
+
+    pointer_tmp = os.path.join(video_dir, f".{CURRENT_FILE}-{version}")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(video_dir, CURRENT_FILE))
+
+    _prune_versions(video_dir, version)
+    return version
+
+
+def load_index(video_id, version, embedding):
+    """Memory-mapping a published index read-only, so workers share its pages instead of copying them."""
+    version_dir = os.path.join(_video_dir(video_id), version)
+    index = faiss.read_index(os.path.join(version_dir, "index.faiss"), MMAP_FLAGS)
+    docstore = SqliteDocstore(os.path.join(version_dir, "docs.db"))
+    index_to_docstore_id = {position: str(position) for position in range(index.ntotal)}
+    return FAISS(embedding, index, docstore, index_to_docstore_id)
+
+
+def _prune_versions(video_dir, current):
+    versions = sorted(
+        (name for name in os.listdir(video_dir) if name.startswith("v")),
+        key=lambda name: os.path.getmtime(os.path.join(video_dir, name))
+    )
+    for name in versions[:-KEEP_VERSIONS]:
+        if name != current:
+            shutil.rmtree(os.path.join(video_dir, name), ignore_errors=True)
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 from openai import OpenAI
+from compressTranscript import compressTranscript, COMPRESS_TRANSCRIPT, COMPRESS_TOKEN_BUDGET
 import os
 
 load_dotenv()
@@ -34,8 +35,15 @@ Your goal is to extract the main topic and provide key bullet points.
 """
 
 
-def sumTranscript(transcript):
+def sumTranscript(transcript, compress=COMPRESS_TRANSCRIPT, token_budget=COMPRESS_TOKEN_BUDGET):
     try:
+        if compress:
+            transcript, stats = compressTranscript(transcript, token_budget)
+            if not stats["skipped"]:
+                print(f"Transcript compressed: {stats['original_tokens']} -> {stats['compressed_tokens']} tokens "
+                      f"(ratio {stats['compression_ratio']}, {stats['elapsed_ms']}ms, "
+                      f"~{stats['original_tokens'] - stats['compressed_tokens']} input tokens saved)")
+
         response = client.chat.completions.create(
             model="deepseek-chat",
             messages=[